@@ -1,92 +1,169 @@
 import pandas as pd
+import numpy as np
+import os
+from openpyxl import load_workbook
+from cc_steps import cc_step_labels
+
+try:
+    import xlsxwriter
+    EXCEL_ENGINE = "xlsxwriter" # Faster .xlsx writer than openpyxl
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+try:
+    import python_calamine
+    # calamine (Rust) parses value-only sheets several times faster than openpyxl
+    CALAMINE = tuple(int(p) for p in pd.__version__.split(".")[:2]) >= (2, 2)
+except ImportError:
+    CALAMINE = False # Stream with openpyxl read-only mode instead
+
+# --- Load the sheet, reusing a parquet copy if the workbook is unchanged ---
+# The copy records the workbook's mtime and size, and is only reused on an exact match
+def read_excel_cached(path):
+    st = os.stat(path)
+    stamp = f"{st.st_mtime_ns}:{st.st_size}".encode()
+    cache_path = path + ".parquet"
+    if os.path.exists(cache_path):
+        try:
+            import pyarrow.parquet as pq
+            if (pq.read_schema(cache_path).metadata or {}).get(b"source_stamp") == stamp:
+                return pd.read_parquet(cache_path)
+        except Exception:
+            pass # No pyarrow or unreadable cache, parse the workbook again
+
+    if CALAMINE:
+        data = pd.read_excel(path, engine="calamine")
+    else:
+        # The first sheet, like pd.read_excel, not whichever tab was left active
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, ())
+            columns = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+            data = pd.DataFrame(list(rows), columns=columns)
+        finally:
+            wb.close()
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"source_stamp": stamp})
+        pq.write_table(table, cache_path)
+    except Exception:
+        pass # Caching is optional (no pyarrow, read-only folder, mixed-type column)
+
+    return data
+
+# --- Per-cycle max without a hash groupby ---
+# Cycler logs are already in cycle order, so sort only if needed and reduce
+# each contiguous run of a cycle (fmax skips NaNs like groupby().max() does)
+def max_by_cycle(sub, cycle_col, columns):
+    sub = sub[sub[cycle_col].notna()]
+    if not sub[cycle_col].is_monotonic_increasing:
+        sub = sub.sort_values(cycle_col, kind="stable")
+    cycles, starts = np.unique(sub[cycle_col].to_numpy(), return_index=True)
+    return pd.DataFrame({name: np.fmax.reduceat(sub[col].to_numpy(), starts).astype("float64")
+                         for name, col in columns.items()},
+                        index=pd.Index(cycles, name="Cycle Index"))
+
+df = read_excel_cached("testdata.xlsx")
+
 # --- Normalize column names (strip spaces, lowercase) ---
-import re
-df = pd.read_excel("testdata.xlsx", engine="openpyxl")
 df.columns = df.columns.str.strip().str.lower()
 
 # --- Identify useful columns automatically ---
-cycle_col   = [c for c in df.columns if "cycle" in c and "index" in c][0]
-voltage_col = [c for c in df.columns if "voltage" in c][0]
-current_col = [c for c in df.columns if "current" in c][0]
-step_col    = [c for c in df.columns if "step" in c and "type" in c][0]
+# One pass over the header; each role keeps the first column matching it
+found = {}
+for c in df.columns:
+    if "cycle" not in found and "cycle" in c and "index" in c:
+        found["cycle"] = c
+    if "voltage" not in found and "voltage" in c:
+        found["voltage"] = c
+    if "current" not in found and "current" in c:
+        found["current"] = c
+    if "step" not in found and "step" in c and "type" in c:
+        found["step"] = c
+    if len(found) == 4:
+        break
+
+cycle_col   = found["cycle"]
+voltage_col = found["voltage"]
+current_col = found["current"]
+step_col    = found["step"]
+
+# Keep only the four columns used below, so the masks and reductions
+# work on a narrow frame
+df = df[[cycle_col, voltage_col, current_col, step_col]]
 
 # --- Ensure numeric for safety ---
+# Kept in float64: this script saves the maxima unrounded, so float32
+# storage would show up in the .xlsx/.csv (3.6 written as 3.5999999046...)
 df[voltage_col] = pd.to_numeric(df[voltage_col], errors="coerce")
 df[current_col] = pd.to_numeric(df[current_col], errors="coerce")
 
+# Rows with neither a voltage nor a current cannot affect any maximum, so
+# drop them before the step classification below
+df = df.dropna(subset=[voltage_col, current_col], how="all")
+
+# --- Classify step types ---
+# Tag rows 1 = CC charge, 2 = CC discharge, 0 = other, with the same rules
+# as the GUI (see cc_steps); the patterns run once per distinct label
+step_codes, step_labels = pd.factorize(df[step_col], sort=False)
+step_label = cc_step_labels(step_codes, step_labels)
+
 # =========================
 # CC CHARGE (your original)
 # =========================
-mask_cc_chg = df[step_col].astype(str).str.contains(
-    r'(?:\bcc\b.*(?:chg|charge))|(?:constant\s*current\s*charge)',
-    flags=re.IGNORECASE, regex=True
-)
+mask_cc_chg = step_label == 1
 df_cc_chg = df[mask_cc_chg]
 
-max_v_cc_chg = df_cc_chg.groupby(cycle_col)[voltage_col].max().reset_index()
-max_v_cc_chg.columns = ["Cycle Index", "Max Voltage CC-Chg (V)"]
+# Max voltage and current per cycle, as float64 for the ESR arithmetic
+agg_cc_chg = max_by_cycle(df_cc_chg, cycle_col, {"Max Voltage CC-Chg (V)": voltage_col,
+                                                 "Max Current CC-Chg (A)": current_col})
 
-max_i_cc_chg = df_cc_chg.groupby(cycle_col)[current_col].max().reset_index()
-max_i_cc_chg.columns = ["Cycle Index", "Max Current CC-Chg (A)"]
-
-print(max_v_cc_chg)
-print(max_i_cc_chg)
+print(agg_cc_chg.sort_index())
 
 # ============================
 # CC DISCHARGE (new, as asked)
 # ============================
-mask_cc_dchg = df[step_col].astype(str).str.contains(
-    r'(?:\bcc\b.*(?:dchg|disch|discharge))|(?:constant\s*current\s*discharge)',
-    flags=re.IGNORECASE, regex=True
-)
+mask_cc_dchg = step_label == 2
 df_cc_dchg = df[mask_cc_dchg]
 
-max_v_cc_dchg = df_cc_dchg.groupby(cycle_col)[voltage_col].max().reset_index()
-max_v_cc_dchg.columns = ["Cycle Index", "Max Voltage CC-DChg (V)"]
-
-max_i_cc_dchg = df_cc_dchg.groupby(cycle_col)[current_col].max().reset_index()
-max_i_cc_dchg.columns = ["Cycle Index", "Max Current CC-DChg (A)"]
+agg_cc_dchg = max_by_cycle(df_cc_dchg, cycle_col, {"Max Voltage CC-DChg (V)": voltage_col,
+                                                   "Max Current CC-DChg (A)": current_col})
 
-print(max_v_cc_dchg)
-print(max_i_cc_dchg)
+print(agg_cc_dchg.sort_index())
 
 # ============================
 # Optional: combine into one table
 # ============================
-out = (max_v_cc_chg
-       .merge(max_i_cc_chg, on="Cycle Index", how="outer")
-       .merge(max_v_cc_dchg, on="Cycle Index", how="outer")
-       .merge(max_i_cc_dchg, on="Cycle Index", how="outer")
-       .sort_values("Cycle Index"))
+out = pd.concat([agg_cc_chg, agg_cc_dchg], axis=1).sort_index().reset_index()
 
 print("\n=== Summary per Cycle ===")
 print(out)
 
 # Save (Colab-friendly)
-out.to_excel("cc_charge_discharge_max_by_cycle.xlsx", index=False)
+out.to_excel("cc_charge_discharge_max_by_cycle.xlsx", index=False, engine=EXCEL_ENGINE)
 out.to_csv("cc_charge_discharge_max_by_cycle.csv", index=False)
 print("Saved: cc_charge_discharge_max_by_cycle.xlsx / .csv")
 
-# === Merge all into one DataFrame ===
-merged = (max_v_cc_chg
-          .merge(max_v_cc_dchg, on="Cycle Index", how="outer")
-          .merge(max_i_cc_chg, on="Cycle Index", how="outer")
-          .merge(max_i_cc_dchg, on="Cycle Index", how="outer")
-          .sort_values("Cycle Index"))
-
-# Rename columns clearly
-merged.columns = [
+# === Reorder the combined table for the ESR step ===
+merged = out[[
     "Cycle Index",
     "Max Voltage CC-Chg (V)",
     "Max Voltage CC-DChg (V)",
     "Max Current CC-Chg (A)",
     "Max Current CC-DChg (A)"
-]
+]].copy()
 
 # === Compute ESR ===
 # (Average of (Vchg - Vdchg)) / (Average of (Ichg - Idchg))
-dv = (merged["Max Voltage CC-Chg (V)"] - merged["Max Voltage CC-DChg (V)"]).mean()
-di = (merged["Max Current CC-Chg (A)"] - merged["Max Current CC-DChg (A)"]).mean()
+# The per-cycle differences are computed once and reused for the per-cycle ESR below
+dv_cycle = merged["Max Voltage CC-Chg (V)"].to_numpy() - merged["Max Voltage CC-DChg (V)"].to_numpy()
+di_cycle = merged["Max Current CC-Chg (A)"].to_numpy() - merged["Max Current CC-DChg (A)"].to_numpy()
+dv = np.nanmean(dv_cycle) # NaN-skipping, like Series.mean()
+di = np.nanmean(di_cycle)
 
 esr = dv / di
 
@@ -96,12 +173,12 @@ print(f"Average ΔI = {di:.6f} A")
 print(f"ESR = {esr:.6f} Ω")
 
 # Optional: add per-cycle ESR if you want
-merged["ESR (Ω)"] = (merged["Max Voltage CC-Chg (V)"] - merged["Max Voltage CC-DChg (V)"]) / \
-                    (merged["Max Current CC-Chg (A)"] - merged["Max Current CC-DChg (A)"])
+# (cycles with ΔI = 0 get NaN instead of inf)
+merged["ESR (Ω)"] = np.divide(dv_cycle, di_cycle, out=np.full_like(dv_cycle, np.nan), where=di_cycle != 0)
 
 print("\n=== Per-cycle ESR values ===")
 print(merged[["Cycle Index", "ESR (Ω)"]])
 
 # Save to Excel
-merged.to_excel("esr_results.xlsx", index=False)
+merged.to_excel("esr_results.xlsx", index=False, engine=EXCEL_ENGINE)
 print("Saved → esr_results.xlsx")
@@ -0,0 +1,31 @@
+"""
+CC charge/discharge step classification, shared by app.py and test.py so
+both scripts take their maxima from the same rows.
+"""
+import re
+import numpy as np
+
+# Step-type patterns, compiled once at import
+CC_CHG_RE = re.compile(r'(?:\bcc\b.*(?:chg|charge))|(?:constant\s*current\s*charge)', re.IGNORECASE)
+CC_DCHG_RE = re.compile(r'(?:\bcc\b.*(?:dchg|disch|discharge))|(?:constant\s*current\s*discharge)', re.IGNORECASE)
+
+def cc_step_labels(codes, labels):
+    """
+    Tags rows 1 = CC charge, 2 = CC discharge, 0 = other.
+
+    Only a handful of distinct step labels exist, so the patterns run once
+    per label and the result is mapped back to the rows by indexing with
+    the codes. Discharge wins when both patterns match, since labels like
+    "CC DChg" also contain "chg".
+
+    Args:
+        codes (ndarray): Integer code of each row's step label (-1 = missing).
+        labels (sequence): The distinct step labels, indexed by code.
+
+    Returns:
+        ndarray: The int8 tag of each row.
+    """
+    per_label = [2 if CC_DCHG_RE.search(str(label)) else 1 if CC_CHG_RE.search(str(label)) else 0
+                 for label in labels]
+    # The trailing 0 is what missing steps, code -1, pick up
+    return np.array(per_label + [0], dtype=np.int8)[codes]
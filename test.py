@@ -1,14 +1,274 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import pandas as pd
-import re
+import numpy as np
 import os
+import json
+import hashlib
+import threading
+from operator import itemgetter
+from openpyxl import load_workbook
+from cc_steps import cc_step_labels
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None # Optional: falls back to NumPy reduceat and groupby
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None # Optional: falls back to the pandas/NumPy aggregation
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None # Optional: falls back to openpyxl for .xlsx export
+
+try:
+    import python_calamine
+    # calamine (Rust) parses value-only sheets several times faster than openpyxl
+    CALAMINE = tuple(int(p) for p in pd.__version__.split(".")[:2]) >= (2, 2)
+except ImportError:
+    CALAMINE = False # Optional: falls back to streaming with openpyxl
+
+# Processed results are kept here between sessions (see process_battery_data_cached)
+RESULTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "battery_analyzer")
+RESULTS_CACHE_VERSION = 5 # Bump when the processing changes, to ignore old results
+RESULTS_CACHE_MAX_ENTRIES = 32 # Older entries (edited workbooks, old versions) are deleted
 
 # --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- ---
 #                 BEGIN DATA PROCESSING LOGIC
 # This function encapsulates your entire pandas script.
 # --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- ---
 
+def _fresh_cache_path(excel_file_path):
+    """
+    Returns the parquet sidecar path of a workbook ("<file>.xlsx.parquet"),
+    the workbook's stamp (mtime in ns and size), and the sidecar's schema
+    if it was written from exactly that version of the workbook, else None.
+    """
+    st = os.stat(excel_file_path) # Raises FileNotFoundError early
+    stamp = f"{st.st_mtime_ns}:{st.st_size}".encode()
+    cache_path = excel_file_path + ".parquet"
+    schema = None
+    if os.path.exists(cache_path):
+        try:
+            import pyarrow.parquet as pq
+            schema = pq.read_schema(cache_path)
+            if (schema.metadata or {}).get(b"source_stamp") != stamp:
+                schema = None # Written from another version of the workbook
+        except Exception:
+            schema = None # No pyarrow, or an unreadable sidecar
+    return cache_path, stamp, schema
+
+def _write_sidecar(df, cache_path, stamp):
+    """
+    Saves a parsed sheet as the parquet sidecar, tagged with the stamp of
+    the workbook it came from.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"source_stamp": stamp})
+    pq.write_table(table, cache_path)
+
+def read_excel_header(excel_file_path):
+    """
+    Returns the column names of the first sheet without loading the data.
+
+    Args:
+        excel_file_path (str): The path to the .xlsx file.
+
+    Returns:
+        list: The header row, as strings.
+    """
+    cache_path, stamp, schema = _fresh_cache_path(excel_file_path)
+    if schema is not None:
+        return schema.names
+
+    # Only the first row is streamed in read-only mode
+    wb = load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        # The first sheet, like pd.read_excel, not whichever tab was left active
+        header = next(wb.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    return [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+
+def _stream_xlsx_columns(excel_file_path, usecols=None):
+    """
+    Reads the first sheet with openpyxl in read-only mode, keeping only
+    the requested columns while the rows stream past.
+
+    Args:
+        excel_file_path (str): The path to the .xlsx file.
+        usecols (list, optional): Names of the columns to keep.
+
+    Returns:
+        DataFrame: The selected columns, using the first row as header.
+    """
+    wb = load_workbook(excel_file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        names = [str(h) if h is not None else f"Unnamed: {i}" for i, h in enumerate(header)]
+        if usecols is None:
+            usecols = names
+        positions = [names.index(c) for c in usecols] # ValueError if a column is missing
+        if not positions:
+            return pd.DataFrame()
+
+        # itemgetter picks all wanted cells of a row in one C call
+        pick = itemgetter(*positions) if len(positions) > 1 else (lambda row: (row[positions[0]],))
+        width = max(positions) + 1
+        picked = [pick(row) if len(row) >= width else pick(row + (None,) * (width - len(row)))
+                  for row in rows]
+    finally:
+        wb.close()
+
+    columns = list(zip(*picked)) if picked else [() for _ in usecols]
+    return pd.DataFrame(dict(zip(usecols, columns)), columns=usecols)
+
+def _apply_dtypes(df, dtype):
+    """
+    Casts columns to the given dtypes. A numeric column holding stray text
+    is coerced instead, turning those cells into NaN.
+    """
+    for col, typ in dtype.items():
+        if df[col].dtype == typ:
+            continue
+        try:
+            df[col] = df[col].astype(typ)
+        except (ValueError, TypeError):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(typ)
+    return df
+
+def load_excel_cached(excel_file_path, usecols=None, dtype=None):
+    """
+    Loads the first sheet of an Excel file into a DataFrame.
+
+    The parsed sheet is stored in a parquet file next to the workbook
+    ("<file>.xlsx.parquet") and reused while the workbook's mtime and size
+    still match the ones recorded in it, so reloading the same file skips
+    the Excel parse.
+
+    Args:
+        excel_file_path (str): The path to the .xlsx file.
+        usecols (list, optional): Only load these columns.
+        dtype (dict, optional): Column -> dtype to cast to, applied after
+            loading. The sidecar keeps the parsed values untouched, since
+            app.py reuses the same file.
+
+    Returns:
+        DataFrame: The sheet contents, using the first row as header.
+    """
+    cache_path, stamp, schema = _fresh_cache_path(excel_file_path)
+    if schema is not None:
+        try:
+            df = pd.read_parquet(cache_path, columns=usecols)
+            return _apply_dtypes(df, dtype) if dtype else df
+        except Exception:
+            pass # Unreadable cache or missing columns, parse the workbook again
+
+    if CALAMINE:
+        df = pd.read_excel(excel_file_path, engine="calamine", usecols=usecols)
+    else:
+        df = _stream_xlsx_columns(excel_file_path, usecols)
+
+    try:
+        _write_sidecar(df, cache_path, stamp)
+    except Exception:
+        pass # Caching is optional (no pyarrow, read-only folder, mixed-type column)
+
+    return _apply_dtypes(df, dtype) if dtype else df
+
+def _cycle_maxima_kernel(cycle_codes, n_cycles, step_label, voltage, current, full):
+    """
+    Per-cycle maxima of all result columns, computed in a single pass.
+
+    Args:
+        cycle_codes (ndarray): pd.factorize codes of the cycle column (-1 = missing).
+        n_cycles (int): Number of distinct cycles.
+        step_label (ndarray): 1 = CC charge, 2 = CC discharge, 0 = other.
+        voltage, current (ndarray): Reduced over the CC rows only.
+        full (ndarray): (rows, k) values reduced over every row of a cycle.
+
+    Returns:
+        tuple: (vmax, imax, fmax), one row per cycle code. vmax and imax have
+               one column per label; NaN where a cycle has nothing to reduce.
+    """
+    vmax = np.full((n_cycles, 2), np.nan)
+    imax = np.full((n_cycles, 2), np.nan)
+    fmax = np.full((n_cycles, full.shape[1]), np.nan)
+    for r in range(len(cycle_codes)):
+        g = cycle_codes[r]
+        if g < 0:
+            continue
+        # "not >=" so the NaN starting value is replaced; x == x skips missing cells
+        for j in range(full.shape[1]):
+            x = full[r, j]
+            if x == x and not fmax[g, j] >= x:
+                fmax[g, j] = x
+        k = step_label[r] - 1
+        if k < 0:
+            continue
+        if voltage[r] == voltage[r] and not vmax[g, k] >= voltage[r]:
+            vmax[g, k] = voltage[r]
+        if current[r] == current[r] and not imax[g, k] >= current[r]:
+            imax[g, k] = current[r]
+    return vmax, imax, fmax
+
+if njit is not None:
+    _cycle_maxima_kernel = njit(cache=True)(_cycle_maxima_kernel)
+
+def _cycle_maxima_polars(df, cycle_col, voltage_col, current_col, full_cols, step_label):
+    """
+    Per-cycle maxima of all result columns in a single lazy Polars group_by.
+
+    Voltage and current are reduced over the CC charge (label 1) and CC
+    discharge (label 2) rows through filters inside the aggregation, the
+    capacity/energy columns over every row of the cycle.
+
+    Data is handed over as NumPy arrays in both directions, so pyarrow is
+    not needed. Polars is only an accelerator: if it cannot run the query
+    (an unsupported column type, an older Polars), None is returned and
+    the caller falls back to the numba/NumPy aggregation.
+
+    Returns:
+        DataFrame: Indexed by cycle, with v_chg, v_dchg, i_chg, i_dchg
+                   followed by one column per entry of full_cols, or None.
+    """
+    try:
+        # NaN becomes null, which max() skips like groupby().max() does
+        frame = pl.DataFrame([pl.Series(c, df[c].to_numpy(), nan_to_null=True)
+                              for c in dict.fromkeys([cycle_col, voltage_col, current_col, *full_cols])]
+                             + [pl.Series("step_label", step_label)])
+        chg = pl.col("step_label") == 1
+        dchg = pl.col("step_label") == 2
+        # Built lazily so the filter and all aggregations run in one streamed pass
+        result = (frame.lazy()
+                       .filter(pl.col(cycle_col).is_not_null()) # groupby() drops missing cycles too
+                       .group_by(cycle_col)
+                       .agg(pl.col(voltage_col).filter(chg).max().alias("v_chg"),
+                            pl.col(voltage_col).filter(dchg).max().alias("v_dchg"),
+                            pl.col(current_col).filter(chg).max().alias("i_chg"),
+                            pl.col(current_col).filter(dchg).max().alias("i_dchg"),
+                            *[pl.col(c).max().alias(f"full_{n}") for n, c in enumerate(full_cols)])
+                       .collect(engine="streaming"))
+        return pd.DataFrame({c: result[c].to_numpy() for c in result.columns}).set_index(cycle_col)
+    except Exception:
+        return None
+
+def _safe_divide(numerator, denominator, valid=True):
+    """
+    Element-wise numerator / denominator, NaN where the denominator is 0
+    or valid (a boolean array) is False.
+    """
+    out = np.full(len(numerator), np.nan)
+    np.divide(numerator, denominator, out=out, where=(denominator != 0) & valid)
+    return out
+
 def process_battery_data(excel_file_path):
     """
     Processes the battery data from the given Excel file.
@@ -25,31 +285,58 @@ def process_battery_data(excel_file_path):
                On failure, (None, None, str)
     """
     try:
-        df = pd.read_excel(excel_file_path, engine="openpyxl")
+        header = read_excel_header(excel_file_path)
     except FileNotFoundError:
         return None, None, f"Error: File not found at {excel_file_path}"
     except Exception as e:
         return None, None, f"Error reading Excel file: {e}"
 
     # --- Normalize column names ---
-    df.columns = df.columns.str.strip().str.lower()
+    # Maps each normalized name back to the name used in the file
+    raw_names = {}
+    for name in header:
+        raw_names.setdefault(name.strip().lower(), name)
+    columns = list(raw_names)
 
     # --- Identify useful columns automatically (with error handling) ---
-    try:
+    # One pass over the header; each role keeps the first column matching it
+    # Note: The snippet shows "Chg. Cap.(Ah)". Normalization makes this "chg. cap.(ah)".
+    found = {}
+    for c in columns:
         # Columns for ESR
-        cycle_col = [c for c in df.columns if "cycle" in c and "index" in c][0]
-        voltage_col = [c for c in df.columns if "voltage" in c][0]
-        current_col = [c for c in df.columns if "current" in c][0]
-        step_col = [c for c in df.columns if "step" in c and "type" in c][0]
-        
+        if "cycle" not in found and "cycle" in c and "index" in c:
+            found["cycle"] = c
+        if "voltage" not in found and "voltage" in c:
+            found["voltage"] = c
+        if "current" not in found and "current" in c:
+            found["current"] = c
+        if "step" not in found and "step" in c and "type" in c:
+            found["step"] = c
+
         # Columns for Capacity and Energy
-        # Note: The snippet shows "Chg. Cap.(Ah)". Normalization makes this "chg. cap.(ah)".
-        chg_cap_col = [c for c in df.columns if "chg. cap.(ah)" in c][0]
-        dchg_cap_col = [c for c in df.columns if "dchg. cap.(ah)" in c][0]
-        chg_nrg_col = [c for c in df.columns if "chg. energy(wh)" in c][0]
-        dchg_nrg_col = [c for c in df.columns if "dchg. energy(wh)" in c][0]
+        if "chg_cap" not in found and "chg. cap.(ah)" in c:
+            found["chg_cap"] = c
+        if "dchg_cap" not in found and "dchg. cap.(ah)" in c:
+            found["dchg_cap"] = c
+        if "chg_nrg" not in found and "chg. energy(wh)" in c:
+            found["chg_nrg"] = c
+        if "dchg_nrg" not in found and "dchg. energy(wh)" in c:
+            found["dchg_nrg"] = c
+
+        if len(found) == 8:
+            break
+
+    try:
+        cycle_col = found["cycle"]
+        voltage_col = found["voltage"]
+        current_col = found["current"]
+        step_col = found["step"]
+        chg_cap_col = found["chg_cap"]
+        dchg_cap_col = found["dchg_cap"]
+        chg_nrg_col = found["chg_nrg"]
+        dchg_nrg_col = found["dchg_nrg"]
         
-    except IndexError:
+    except KeyError:
         error_msg = ("Error: Could not find required columns.\n"
                      "Please ensure your file has columns containing:\n"
                      "- 'cycle' and 'index'\n"
@@ -62,68 +349,92 @@ def process_battery_data(excel_file_path):
                      "- 'dchg. energy(wh)'")
         return None, None, error_msg
 
-    # --- Ensure numeric for safety ---
-    numeric_cols = [voltage_col, current_col, chg_cap_col, dchg_cap_col, chg_nrg_col, dchg_nrg_col]
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # --- Load only the required columns, typed at ingestion ---
+    # Numeric columns stay float64: the table shows 6 decimals, and float32
+    # voltage/current would already change some of them (3.586696 -> 3.586695).
+    needed_cols = list(dict.fromkeys([cycle_col, voltage_col, current_col, step_col,
+                                      chg_cap_col, dchg_cap_col, chg_nrg_col, dchg_nrg_col]))
+    dtypes = {raw_names[c]: "float64" for c in (voltage_col, current_col, chg_cap_col,
+                                                dchg_cap_col, chg_nrg_col, dchg_nrg_col)}
+    dtypes[raw_names[step_col]] = "category" # A handful of labels, stored as small integer codes
+    try:
+        df = load_excel_cached(excel_file_path, usecols=[raw_names[c] for c in needed_cols],
+                               dtype=dtypes)
+    except Exception as e:
+        return None, None, f"Error reading Excel file: {e}"
+    df.columns = df.columns.str.strip().str.lower()
     
     # Drop rows where conversion failed
     df = df.dropna(subset=[voltage_col, current_col]) # ESR cols are essential
 
-    # =========================
-    # CC CHARGE (for ESR)
-    # =========================
-    mask_cc_chg = df[step_col].astype(str).str.contains(
-        r'(?:\bcc\b.*(?:chg|charge))|(?:constant\s*current\s*charge)',
-        flags=re.IGNORECASE, regex=True
-    )
-    df_cc_chg = df[mask_cc_chg]
-    
-    if df_cc_chg.empty:
-        return None, None, "Error: No 'Constant Current Charge' steps found."
-
-    max_v_cc_chg = df_cc_chg.groupby(cycle_col)[voltage_col].max().reset_index()
-    max_i_cc_chg = df_cc_chg.groupby(cycle_col)[current_col].max().reset_index()
+    # --- Classify step types ---
+    # The categorical's codes and categories go straight to the shared
+    # classification, so the patterns run once per category
 
     # ============================
-    # CC DISCHARGE (for ESR)
+    # CC CHARGE / DISCHARGE (for ESR)
     # ============================
-    mask_cc_dchg = df[step_col].astype(str).str.contains(
-        r'(?:\bcc\b.*(?:dchg|disch|discharge))|(?:constant\s*current\s*discharge)',
-        flags=re.IGNORECASE, regex=True
-    )
-    df_cc_dchg = df[mask_cc_dchg]
+    # Tag rows 1 = CC charge, 2 = CC discharge, 0 = other (see cc_steps)
+    step_label = cc_step_labels(df[step_col].cat.codes.to_numpy(), df[step_col].cat.categories)
 
-    if df_cc_dchg.empty:
-        return None, None, "Error: No 'Constant Current Discharge' steps found."
+    if not (step_label == 1).any():
+        return None, None, "Error: No 'Constant Current Charge' steps found."
 
-    max_v_cc_dchg = df_cc_dchg.groupby(cycle_col)[voltage_col].max().reset_index()
-    max_i_cc_dchg = df_cc_dchg.groupby(cycle_col)[current_col].max().reset_index()
+    if not (step_label == 2).any():
+        return None, None, "Error: No 'Constant Current Discharge' steps found."
 
-    # ============================
-    # CAPACITY & ENERGY (from full file)
-    # ============================
-    # Get the max capacity/energy for each cycle (from any step)
-    chg_cap = df.groupby(cycle_col)[chg_cap_col].max().reset_index()
-    dchg_cap = df.groupby(cycle_col)[dchg_cap_col].max().reset_index()
-    chg_nrg = df.groupby(cycle_col)[chg_nrg_col].max().reset_index()
-    dchg_nrg = df.groupby(cycle_col)[dchg_nrg_col].max().reset_index()
+    full_cols = [chg_cap_col, dchg_cap_col, chg_nrg_col, dchg_nrg_col]
+    # All eight maxima from a single Polars group_by, when it is available and succeeds
+    cycle_max = None
+    if pl is not None:
+        cycle_max = _cycle_maxima_polars(df, cycle_col, voltage_col, current_col, full_cols, step_label)
+
+    if cycle_max is None and njit is not None:
+        # All eight maxima from one compiled pass over the rows
+        cycle_codes, cycles = pd.factorize(df[cycle_col], sort=False)
+        vmax, imax, fmax = _cycle_maxima_kernel(cycle_codes, len(cycles), step_label,
+                                                df[voltage_col].to_numpy(), df[current_col].to_numpy(),
+                                                df[full_cols].to_numpy(dtype=np.float64))
+        cycle_max = pd.DataFrame(np.column_stack([vmax, imax, fmax]),
+                                 index=pd.Index(cycles, name=cycle_col))
+    elif cycle_max is None:
+        # Sort each subset by cycle (usually already in order) and reduce the
+        # contiguous runs with np.maximum.reduceat instead of a hash groupby
+        cycle_ids = df[cycle_col].to_numpy()
+        voltage = df[voltage_col].to_numpy()
+        current = df[current_col].to_numpy()
+        parts = []
+        for k, v_name, i_name in ((1, "v_chg", "i_chg"), (2, "v_dchg", "i_dchg")):
+            rows = (step_label == k) & pd.notna(cycle_ids)
+            c, v, i = cycle_ids[rows], voltage[rows], current[rows]
+            if not np.all(c[1:] >= c[:-1]):
+                order = np.argsort(c, kind="stable")
+                c, v, i = c[order], v[order], i[order]
+            uniq, starts = np.unique(c, return_index=True)
+            parts.append(pd.DataFrame({v_name: np.maximum.reduceat(v, starts),
+                                       i_name: np.maximum.reduceat(i, starts)},
+                                      index=pd.Index(uniq, name=cycle_col)))
+        cc_max = parts[0].join(parts[1], how="outer")[["v_chg", "v_dchg", "i_chg", "i_dchg"]]
+
+        # ============================
+        # CAPACITY & ENERGY (from full file)
+        # ============================
+        # Get the max capacity/energy for each cycle (from any step)
+        # One groupby hashes the cycle column once for all four columns; the
+        # index sort below puts the groups in order, so the groupby skips it
+        full_agg = df.groupby(cycle_col, sort=False)[full_cols].max()
+        cycle_max = pd.concat([cc_max, full_agg], axis=1)
 
 
     # === Merge all into one DataFrame ===
-    merged = (max_v_cc_chg
-              .merge(max_v_cc_dchg, on=cycle_col, how="outer", suffixes=("_chg_v", "_dchg_v"))
-              .merge(max_i_cc_chg, on=cycle_col, how="outer")
-              .merge(max_i_cc_dchg, on=cycle_col, how="outer", suffixes=("_chg_i", "_dchg_i"))
-              .merge(chg_cap, on=cycle_col, how="outer")
-              .merge(dchg_cap, on=cycle_col, how="outer")
-              .merge(chg_nrg, on=cycle_col, how="outer")
-              .merge(dchg_nrg, on=cycle_col, how="outer")
-             )
+    # Everything is indexed by cycle, so one aligned concat replaces the merge chain.
+    # The cycle stays the index, so ordering is a plain integer index sort.
+    # Metrics are computed in float64 (this is one row per cycle).
+    merged = cycle_max.sort_index().astype("float64")
     
     # Rename columns clearly
+    merged.index.name = "Cycle Index"
     merged.columns = [
-        "Cycle Index",
         "Max Voltage CC-Chg (V)",
         "Max Voltage CC-DChg (V)",
         "Max Current CC-Chg (A)",
@@ -134,25 +445,36 @@ def process_battery_data(excel_file_path):
         "Discharge Energy (Wh)"
     ]
     
-    merged = merged.sort_values("Cycle Index").dropna()
+    # === Compute Per-Cycle Metrics ===
+    
+    # Plain arrays avoid the index alignment of Series arithmetic, and a
+    # division by zero gives NaN directly instead of inf to be replaced later
+    v = merged[["Max Voltage CC-Chg (V)", "Max Voltage CC-DChg (V)"]].to_numpy()
+    i = merged[["Max Current CC-Chg (A)", "Max Current CC-DChg (A)"]].to_numpy()
+    cap = merged[["Charge Capacity (Ah)", "Discharge Capacity (Ah)"]].to_numpy()
+    nrg = merged[["Charge Energy (Wh)", "Discharge Energy (Wh)"]].to_numpy()
+
+    # Keep partial cycles (e.g. a last cycle that never reached CC discharge)
+    # in the table instead of dropping every row with a gap. Each metric is
+    # computed where its own inputs exist and is NaN elsewhere, and the
+    # averages skip NaN. CE/EE also need both CC steps: a cycle that never
+    # discharged still records a discharge capacity/energy of 0, and its 0%
+    # would drag the averages down.
+    esr_ok = ~(np.isnan(v).any(axis=1) | np.isnan(i).any(axis=1))
+    ce_ok = esr_ok & ~np.isnan(cap).any(axis=1)
+    ee_ok = esr_ok & ~np.isnan(nrg).any(axis=1)
     
-    if merged.empty:
+    if not esr_ok.any():
         return None, None, "Error: No matching charge/discharge cycles found."
 
-    # === Compute Per-Cycle Metrics ===
-    
     # 1. ESR
-    merged["ESR (Ω)"] = (merged["Max Voltage CC-Chg (V)"] - merged["Max Voltage CC-DChg (V)"]) / \
-                      (merged["Max Current CC-Chg (A)"] - merged["Max Current CC-DChg (A)"])
+    merged["ESR (Ω)"] = _safe_divide(v[:, 0] - v[:, 1], i[:, 0] - i[:, 1], esr_ok)
 
     # 2. Coulombic Efficiency
-    merged["Coulombic Efficiency (%)"] = (merged["Discharge Capacity (Ah)"] / merged["Charge Capacity (Ah)"]) * 100
+    merged["Coulombic Efficiency (%)"] = _safe_divide(cap[:, 1], cap[:, 0], ce_ok) * 100
     
     # 3. Energy Efficiency
-    merged["Energy Efficiency (%)"] = (merged["Discharge Energy (Wh)"] / merged["Charge Energy (Wh)"]) * 100
-
-    # Replace infinite values (from division by zero) with NaN
-    merged.replace([float('inf'), float('-inf')], float('nan'), inplace=True)
+    merged["Energy Efficiency (%)"] = _safe_divide(nrg[:, 1], nrg[:, 0], ee_ok) * 100
 
     # === Compute Average Summary Metrics ===
     avg_esr = merged["ESR (Ω)"].mean()
@@ -165,11 +487,98 @@ def process_battery_data(excel_file_path):
         'avg_ee': avg_ee
     }
 
-    # Round for display
-    merged = merged.round(6)
+    # Round for display, with the cycle back as the first column
+    merged = merged.reset_index().round(6)
 
     return merged, summary_metrics, None
 
+def _results_cache_paths(excel_file_path):
+    """
+    Returns the (.parquet, .json) results cache paths of a workbook, keyed
+    on its path, modification time and size.
+    """
+    st = os.stat(excel_file_path)
+    ident = f"{RESULTS_CACHE_VERSION}:{os.path.abspath(excel_file_path)}:{st.st_mtime_ns}:{st.st_size}"
+    key = hashlib.blake2b(ident.encode(), digest_size=8).hexdigest()
+    base = os.path.join(RESULTS_CACHE_DIR, key)
+    return base + ".parquet", base + ".json"
+
+def _prune_results_cache(keep):
+    """
+    Deletes all but the `keep` most recently written entries of the
+    results cache.
+    """
+    written = {}
+    for name in os.listdir(RESULTS_CACHE_DIR):
+        key, ext = os.path.splitext(name)
+        if ext in (".parquet", ".json"):
+            mtime = os.path.getmtime(os.path.join(RESULTS_CACHE_DIR, name))
+            written[key] = max(written.get(key, mtime), mtime)
+    for key in sorted(written, key=written.get, reverse=True)[keep:]:
+        for ext in (".parquet", ".json"):
+            try:
+                os.remove(os.path.join(RESULTS_CACHE_DIR, key + ext))
+            except OSError:
+                pass # Already gone
+
+def process_battery_data_cached(excel_file_path):
+    """
+    Same as process_battery_data, but reuses the results of an earlier run
+    on the unchanged file from the on-disk cache in RESULTS_CACHE_DIR.
+
+    Returns:
+        tuple: (merged_df, summary_metrics_dict, error_message)
+    """
+    try:
+        table_path, summary_path = _results_cache_paths(excel_file_path)
+    except OSError:
+        return process_battery_data(excel_file_path) # Let it report the problem
+
+    try:
+        with open(summary_path, encoding="utf-8") as f:
+            summary = json.load(f)
+        return pd.read_parquet(table_path), summary, None
+    except Exception:
+        pass # Not cached yet, or unreadable
+
+    merged, summary, error = process_battery_data(excel_file_path)
+    if error is None:
+        try:
+            os.makedirs(RESULTS_CACHE_DIR, exist_ok=True)
+            merged.to_parquet(table_path, index=False)
+            with open(summary_path, "w", encoding="utf-8") as f:
+                json.dump({k: float(v) for k, v in summary.items()}, f)
+            _prune_results_cache(RESULTS_CACHE_MAX_ENTRIES)
+        except Exception:
+            pass # Caching is optional (no pyarrow, read-only home)
+    return merged, summary, error
+
+def write_results_excel(df, file_path):
+    """
+    Saves a DataFrame as .xlsx without an index column.
+
+    With xlsxwriter installed, rows are streamed to disk in constant_memory
+    mode. pandas writes cells column by column, which that mode cannot
+    handle, so the rows are written here one by one instead.
+
+    Args:
+        df (DataFrame): The table to save.
+        file_path (str): The destination .xlsx path.
+    """
+    if xlsxwriter is None:
+        df.to_excel(file_path, index=False, engine='openpyxl')
+        return
+
+    wb = xlsxwriter.Workbook(file_path, {'constant_memory': True})
+    try:
+        ws = wb.add_worksheet()
+        ws.write_row(0, 0, [str(c) for c in df.columns])
+        for r, row in enumerate(df.to_numpy(dtype=object).tolist(), start=1):
+            # NaN stays an empty cell, as with to_excel
+            ws.write_row(r, 0, [None if pd.isna(v) else v for v in row])
+    finally:
+        wb.close()
+
 # --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- ---
 #                  BEGIN TKINTER GUI
 # --- --- --- --- --- --- --- --- --- --- --- --- --- --- --- ---
@@ -205,6 +614,8 @@ class BatteryAnalyzerApp:
         self.average_ce = tk.StringVar(value="Avg. CE: N/A")
         self.average_ee = tk.StringVar(value="Avg. Energy Eff: N/A")
         self.results_df = None # To store the results dataframe for export
+        self._results_cache = {} # (path, mtime) -> (df, summary), so reloading skips reprocessing
+        self._fill_job = None # Pending after() call that inserts the next batch of table rows
 
         # --- Main Frame ---
         main_frame = ttk.Frame(self.root, padding=10)
@@ -216,14 +627,17 @@ class BatteryAnalyzerApp:
 
         ttk.Label(top_frame, text="Battery Data Analyzer", style="Title.TLabel").pack(side=tk.LEFT, anchor="w", padx=5)
         
-        load_button = ttk.Button(top_frame, text="Load Excel File", command=self.load_file)
-        load_button.pack(side=tk.RIGHT, anchor="e", padx=5)
+        self.load_button = ttk.Button(top_frame, text="Load Excel File", command=self.load_file)
+        self.load_button.pack(side=tk.RIGHT, anchor="e", padx=5)
 
         # --- File Label Frame ---
         file_frame = ttk.Frame(main_frame)
         file_frame.pack(fill=tk.X, pady=5)
         ttk.Label(file_frame, textvariable=self.selected_file, font=("Inter", 9, "italic")).pack(side=tk.LEFT, padx=5)
 
+        # Busy indicator while a file is processed on the worker thread
+        self.progress = ttk.Progressbar(file_frame, mode="indeterminate", length=160)
+
         # --- Result Frame ---
         result_frame = ttk.Frame(main_frame, padding=10)
         result_frame.pack(fill=tk.X)
@@ -273,11 +687,48 @@ class BatteryAnalyzerApp:
         self.average_ce.set("Avg. CE: Calculating...")
         self.average_ee.set("Avg. Energy Eff: Calculating...")
         self.export_button.config(state="disabled") # Disable while processing
+        self.load_button.config(state="disabled") # One file at a time
         self.results_df = None # Clear old results
-        self.root.update_idletasks() # Force GUI update
 
-        # Run the processing
-        df, summary, error = process_battery_data(file_path)
+        # Unchanged file that was already processed: reuse the results
+        try:
+            cache_key = (file_path, os.path.getmtime(file_path))
+        except OSError:
+            cache_key = None # Let process_battery_data report the problem
+        if cache_key in self._results_cache:
+            df, summary = self._results_cache[cache_key]
+            self._on_processing_done(file_path, df, summary, None, None)
+            return
+
+        # Run the processing on a worker thread so the window stays responsive
+        self.progress.pack(side=tk.RIGHT, padx=5)
+        self.progress.start(10)
+        threading.Thread(target=self._process_worker, args=(file_path, cache_key), daemon=True).start()
+
+    def _process_worker(self, file_path, cache_key):
+        """
+        Run process_battery_data off the Tk main thread and hand the
+        result back to it.
+        """
+        try:
+            df, summary, error = process_battery_data_cached(file_path)
+        except Exception as e:
+            df, summary, error = None, None, f"Unexpected error while processing: {e}"
+        self.root.after(0, self._on_processing_done, file_path, df, summary, error, cache_key)
+
+    def _on_processing_done(self, file_path, df, summary, error, cache_key):
+        """
+        Show the processing results (runs on the Tk main thread).
+        """
+        self.progress.stop()
+        self.progress.pack_forget()
+        self.load_button.config(state="normal")
+
+        if not error and cache_key is not None:
+            if len(self._results_cache) >= 8:
+                # Keep memory bounded: forget the oldest file
+                del self._results_cache[next(iter(self._results_cache))]
+            self._results_cache[cache_key] = (df, summary)
 
         # Handle results
         if error:
@@ -305,9 +756,11 @@ class BatteryAnalyzerApp:
         """
         Clear and populate the Treeview widget with DataFrame data.
         """
-        # Clear existing data
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        # Stop filling in a previous table, then clear it (one call for all items)
+        if self._fill_job is not None:
+            self.root.after_cancel(self._fill_job)
+            self._fill_job = None
+        self.tree.delete(*self.tree.get_children())
         
         if df.empty:
             self.tree["columns"] = []
@@ -322,12 +775,28 @@ class BatteryAnalyzerApp:
             self.tree.column(col, anchor="center", width=140) # Made columns wider
 
         # --- Insert data ---
-        for index, row in df.iterrows():
-            self.tree.insert("", "end", values=list(row))
+        # Cells are formatted to text once per column (missing values, e.g.
+        # the metrics of a partial cycle, stay blank), and rows come out as
+        # plain tuples instead of a Series per row (iterrows)
+        rows = list(df.astype(str).mask(df.isna(), "").itertuples(index=False, name=None))
+        insert = self.tree.insert
+        chunk = 500
+
+        # Rows go in batches between event loop turns, so the window keeps
+        # responding while a long table fills in
+        def insert_chunk(start):
+            for row in rows[start:start + chunk]:
+                insert("", "end", values=row)
+            if start + chunk < len(rows):
+                self._fill_job = self.root.after(0, insert_chunk, start + chunk)
+            else:
+                self._fill_job = None
+
+        insert_chunk(0)
 
     def export_results(self):
         """
-        Save the processed results DataFrame to an Excel or CSV file.
+        Save the processed results DataFrame to an Excel, CSV or Parquet file.
         """
         if self.results_df is None or self.results_df.empty:
             messagebox.showwarning("No Data", "There is no data to export. Please load a file first.")
@@ -335,10 +804,11 @@ class BatteryAnalyzerApp:
 
         file_path = filedialog.asksaveasfilename(
             title="Save Results As",
-            initialfile="battery_metrics_results.xlsx",
-            defaultextension=".xlsx",
-            filetypes=[("Excel files", "*.xlsx"), 
-                       ("CSV files", "*.csv"),
+            initialfile="battery_metrics_results.csv",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), # Much faster to write than .xlsx
+                       ("Excel files", "*.xlsx"),
+                       ("Parquet files", "*.parquet"), # Compact and typed, for further analysis
                        ("All files", "*.*")]
         )
 
@@ -347,12 +817,14 @@ class BatteryAnalyzerApp:
 
         try:
             if file_path.endswith('.xlsx'):
-                self.results_df.to_excel(file_path, index=False, engine='openpyxl')
+                write_results_excel(self.results_df, file_path)
             elif file_path.endswith('.csv'):
                 self.results_df.to_csv(file_path, index=False)
+            elif file_path.endswith('.parquet'):
+                self.results_df.to_parquet(file_path, index=False)
             else:
                 # Default to excel if unsure
-                self.results_df.to_excel(file_path + ".xlsx", index=False, engine='openpyxl')
+                write_results_excel(self.results_df, file_path + ".xlsx")
 
             messagebox.showinfo("Export Successful", f"Results successfully saved to:\n{file_path}")
         except Exception as e: